@@ -27,10 +27,26 @@ def effective_suit(card, trump_suit):
         return trump_suit
     return card.suit
 
+SUIT_OFFSETS = {s: i * len(RANKS) for i, s in enumerate(SUITS)}
+RANK_INDICES = {r: i for i, r in enumerate(RANKS)}
+
+def card_index(card):
+    """
+    Returns a compact index (0-23) for a card, grouped by suit in SUITS order.
+    """
+    return card.index
+
+def card_from_index(index):
+    """
+    Returns the Card with the given compact index.
+    """
+    return Card(SUITS[index // len(RANKS)], RANKS[index % len(RANKS)])
+
 class Card:
     def __init__(self, suit, rank):
         self.suit = suit
         self.rank = rank
+        self.index = SUIT_OFFSETS[suit] + RANK_INDICES[rank]
 
     def __repr__(self):
         return f"{self.rank} of {self.suit}"
@@ -54,6 +70,9 @@ class Card:
             return 10 + order.index(self.rank)
         return order.index(self.rank)
 
+# One instance of every card, indexed by card_index
+DECK = [Card(s, r) for s in SUITS for r in RANKS]
+
 class Deck:
     def __init__(self):
         self.cards = [Card(s, r) for s in SUITS for r in RANKS]
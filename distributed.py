@@ -0,0 +1,270 @@
+import argparse
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from main import agent_class, play_games, report
+
+##### ----- JOB DIRECTORY LAYOUT ----- #####
+#   job.json           pairings, settings and the list of shards
+#   claims/<shard>     held by the worker running a shard; its mtime is a heartbeat
+#   results/<shard>    mergeable partial result of a finished shard
+#
+# Games are seeded by their number, so a shard gives the same result wherever and
+# however many times it is run. Running a shard twice is wasteful but harmless.
+
+DEFAULT_LEASE = 900
+
+def write_json(path, data):
+    """
+    Writes `data` to `path` atomically, so readers never see a partial file.
+    """
+    tmp = f"{path}.tmp-{socket.gethostname()}-{os.getpid()}"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+def plan(job_dir, pairings, game_count, shard_size=100, fdpu=False, seed=0):
+    """
+    Writes a job file splitting `game_count` games of every pairing (a list of four
+    agent names, seated P1-P4) into seed-range shards of `shard_size` games.
+    """
+    shards = []
+    for i, _ in enumerate(pairings):
+        for start in range(0, game_count, shard_size):
+            stop = min(start + shard_size, game_count)
+            shards.append({"id": f"p{i:03d}-{start:08d}", "pairing": i, "start": start, "stop": stop})
+    job = {
+        "pairings": pairings,
+        "game_count": game_count,
+        "shard_size": shard_size,
+        "fdpu": fdpu,
+        "seed": seed,
+        "shards": shards,
+    }
+    job_path = os.path.join(job_dir, "job.json")
+    if os.path.exists(job_path) and read_json(job_path) != job:
+        # Shard ids only number the shards, so old results would be merged as the new job's
+        started = [
+            name for sub in ("claims", "results") if os.path.isdir(os.path.join(job_dir, sub))
+            for name in os.listdir(os.path.join(job_dir, sub))
+        ]
+        if started:
+            raise ValueError(f"{job_dir} already holds results or claims of a different job")
+    os.makedirs(os.path.join(job_dir, "claims"), exist_ok=True)
+    os.makedirs(os.path.join(job_dir, "results"), exist_ok=True)
+    write_json(job_path, job)
+    print(f"Planned {len(shards)} shards for {len(pairings)} pairings in {job_dir}")
+    return job
+
+##### ----- CLAIMS ----- #####
+def result_path(job_dir, shard_id):
+    return os.path.join(job_dir, "results", f"{shard_id}.json")
+
+def claim_path(job_dir, shard_id):
+    return os.path.join(job_dir, "claims", shard_id)
+
+def try_claim(job_dir, shard_id, worker, lease):
+    """
+    Claims a shard for `worker`. A claim whose heartbeat is older than `lease` seconds
+    belongs to a crashed worker and is taken over.
+    """
+    path = claim_path(job_dir, shard_id)
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        try:
+            age = time.time() - os.path.getmtime(path)
+        except FileNotFoundError:
+            return False
+        if age < lease:
+            return False
+        # Only one worker can rename the stale claim away
+        stale = f"{path}.stale-{worker}"
+        try:
+            os.rename(path, stale)
+        except FileNotFoundError:
+            return False
+        os.remove(stale)
+        print(f"[{worker}] Reclaiming {shard_id} (no heartbeat for {round(age)}s)")
+        return try_claim(job_dir, shard_id, worker, lease)
+    with os.fdopen(fd, "w") as f:
+        f.write(worker)
+    return True
+
+def holds_claim(job_dir, shard_id, worker):
+    try:
+        with open(claim_path(job_dir, shard_id)) as f:
+            return f.read() == worker
+    except FileNotFoundError:
+        return False
+
+def heartbeat(job_dir, shard_id, worker):
+    """
+    Refreshes `worker`'s claim on a shard. Returns False if the claim has been taken
+    over (or already finished) by another worker.
+    """
+    if not holds_claim(job_dir, shard_id, worker):
+        return False
+    try:
+        os.utime(claim_path(job_dir, shard_id))
+    except FileNotFoundError:
+        return False
+    return True
+
+def release(job_dir, shard_id, worker):
+    if not holds_claim(job_dir, shard_id, worker):
+        return
+    try:
+        os.remove(claim_path(job_dir, shard_id))
+    except FileNotFoundError:
+        pass
+
+##### ----- WORKERS ----- #####
+def run_shard(job_dir, job, shard, worker):
+    """
+    Plays the games of one shard, one at a time so the claim's heartbeat stays fresh.
+    Returns None if the claim was lost to another worker.
+    """
+    agents = [agent_class(name) for name in job["pairings"][shard["pairing"]]]
+    wins = {0: 0, 1: 0}
+    points = {0: 0, 1: 0}
+    for game in range(shard["start"], shard["stop"]):
+        w, p = play_games(*agents, game, game + 1, job["fdpu"], job["seed"], logs=False)
+        for team in (0, 1):
+            wins[team] += w[team]
+            points[team] += p[team]
+        if not heartbeat(job_dir, shard["id"], worker):
+            return None
+    return {"wins": wins, "points": points, "games": shard["stop"] - shard["start"]}
+
+def work(job_dir, worker=None, lease=DEFAULT_LEASE, poll=5):
+    """
+    Claims and runs shards until every shard of the job has a result. While other
+    workers hold the remaining shards it keeps polling, so shards whose worker stops
+    sending heartbeats are re-run.
+    """
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    job = read_json(os.path.join(job_dir, "job.json"))
+    while True:
+        remaining = [s for s in job["shards"] if not os.path.exists(result_path(job_dir, s["id"]))]
+        if not remaining:
+            return
+        ran = False
+        for shard in remaining:
+            if os.path.exists(result_path(job_dir, shard["id"])):
+                continue
+            if not try_claim(job_dir, shard["id"], worker, lease):
+                continue
+            result = run_shard(job_dir, job, shard, worker)
+            ran = True
+            if result is None:
+                print(f"[{worker}] Lost the claim on {shard['id']} to another worker")
+                continue
+            result["worker"] = worker
+            write_json(result_path(job_dir, shard["id"]), result)
+            release(job_dir, shard["id"], worker)
+            print(f"[{worker}] Finished {shard['id']}")
+        if not ran:
+            time.sleep(poll)
+
+def run_local(job_dir, workers, lease=DEFAULT_LEASE):
+    """
+    Runs `workers` worker processes on this machine and merges their results.
+    """
+    procs = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "work", job_dir,
+                          "--worker", f"local-{i}", "--lease", str(lease)])
+        for i in range(workers)
+    ]
+    for proc in procs:
+        proc.wait()
+    return merge(job_dir)
+
+##### ----- MERGE ----- #####
+def merge(job_dir):
+    """
+    Sums the shard results of every pairing and writes the final report. Returns None
+    if some shards have not finished yet.
+    """
+    job = read_json(os.path.join(job_dir, "job.json"))
+    totals = [{"wins": {0: 0, 1: 0}, "points": {0: 0, 1: 0}, "games": 0} for _ in job["pairings"]]
+    missing = []
+    for shard in job["shards"]:
+        path = result_path(job_dir, shard["id"])
+        if not os.path.exists(path):
+            missing.append(shard["id"])
+            continue
+        result = read_json(path)
+        total = totals[shard["pairing"]]
+        for team in (0, 1):
+            total["wins"][team] += result["wins"][str(team)]
+            total["points"][team] += result["points"][str(team)]
+        total["games"] += result["games"]
+    if missing:
+        print(f"{len(missing)} shards have not finished: {', '.join(missing)}")
+        return None
+
+    for i, (pairing, total) in enumerate(zip(job["pairings"], totals)):
+        print(f"\n=== Pairing {i}: {pairing[0]}/{pairing[2]} vs {pairing[1]}/{pairing[3]} ===")
+        report(total["wins"], total["points"], total["games"], os.path.join(job_dir, f"pairing{i:03d}"))
+    write_json(os.path.join(job_dir, "report.json"), [
+        {"pairing": pairing, **total} for pairing, total in zip(job["pairings"], totals)
+    ])
+    return totals
+
+##### ----- ENTRY POINT ----- #####
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a competition as shards across machines.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("plan", help="write a job file")
+    p.add_argument("job_dir")
+    p.add_argument("--pairing", nargs=4, action="append", default=[], metavar="AGENT",
+                   help="agents seated P1-P4; may be repeated")
+    p.add_argument("--matrix", nargs="+", default=[], metavar="AGENT",
+                   help="play every ordered pair of these agents as partnerships")
+    p.add_argument("--games", type=int, required=True, help="games per pairing")
+    p.add_argument("--shard-size", type=int, default=100)
+    p.add_argument("--fdpu", action="store_true")
+    p.add_argument("--seed", type=int, default=0)
+
+    p = commands.add_parser("work", help="claim and run shards")
+    p.add_argument("job_dir")
+    p.add_argument("--worker")
+    p.add_argument("--lease", type=float, default=DEFAULT_LEASE)
+
+    p = commands.add_parser("local", help="run several workers on this machine, then merge")
+    p.add_argument("job_dir")
+    p.add_argument("--workers", type=int, default=os.cpu_count())
+    p.add_argument("--lease", type=float, default=DEFAULT_LEASE)
+
+    p = commands.add_parser("merge", help="merge shard results into the final report")
+    p.add_argument("job_dir")
+
+    args = parser.parse_args()
+    if args.command == "plan":
+        pairings = args.pairing + [[a, b, a, b] for a, b in itertools.permutations(args.matrix, 2)]
+        if not pairings:
+            parser.error("give at least one --pairing or a --matrix")
+        for name in {name for pairing in pairings for name in pairing}:
+            agent_class(name)
+        try:
+            plan(args.job_dir, pairings, args.games, args.shard_size, args.fdpu, args.seed)
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.command == "work":
+        work(args.job_dir, args.worker, args.lease)
+    elif args.command == "local":
+        run_local(args.job_dir, args.workers, args.lease)
+    elif args.command == "merge":
+        if merge(args.job_dir) is None:
+            sys.exit(1)
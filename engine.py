@@ -22,6 +22,8 @@ class GameEngine:
         hands, kitty = deck.deal()
         for i, p in enumerate(self.players):
             p.set_hand(hands[i])
+            p.dealer_nbr = self.players[self.dealer_index].nbr
+            p.upcard = kitty[0]
             p.reset()
 
         rnd = Round(self.players, self.dealer_index, self.force_dealer_pick_up, logger=self.logger)
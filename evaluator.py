@@ -0,0 +1,250 @@
+import argparse
+import os
+
+import numpy as np
+
+from cards import *
+from features import *
+from player import Player, get_playable_cards
+
+##### ----- ACTION FEATURES ----- #####
+# Each candidate action is described by a short feature vector; an action's score is
+# the dot product of that vector with the weights for its decision kind.
+
+BID_SIZE = 13
+DISCARD_SIZE = 7
+PLAY_SIZE = 13
+
+def bid_features(hand, suit, upcard, seat, first_round):
+    """
+    Features for calling `suit` as trump (or passing, if `suit` is None). `seat` is the
+    player's position to the left of the dealer (0 for the dealer).
+    """
+    f = np.zeros(BID_SIZE)
+    if suit is None:
+        f[9 + seat] = 1
+        return f
+    f[0] = 1
+    trump_count = 0
+    for card in hand:
+        if effective_suit(card, suit) == suit:
+            trump_count += 1
+            value = card.value(suit, None)
+            if value == 200:
+                f[2] = 1
+            elif value == 199:
+                f[3] = 1
+        elif card.rank == "A":
+            f[4] += 1
+    f[1] = trump_count / 5
+    held = {effective_suit(c, suit) for c in hand}
+    f[5] = sum(1 for s in SUITS if s != suit and s not in held)
+    if first_round:
+        ours = seat % 2 == 0
+        f[6] = 1 if ours else 0
+        f[7] = 0 if ours else 1
+        f[8] = (1 if ours else -1) * upcard.value(suit, None) / 200
+    return f
+
+def discard_features(hand, trump, card):
+    """
+    Features for discarding `card` from `hand` once `trump` is known.
+    """
+    f = np.zeros(DISCARD_SIZE)
+    suit = effective_suit(card, trump)
+    suit_count = sum(1 for c in hand if effective_suit(c, trump) == suit)
+    f[0] = 1
+    f[1] = 1 if suit == trump else 0
+    f[2] = RANKS.index(card.rank) / 5
+    f[3] = 1 if card.rank == "A" else 0
+    f[4] = 1 if suit != trump and suit_count == 1 else 0
+    f[5] = suit_count / 5
+    f[6] = 1 if card.value(trump, None) >= 199 else 0
+    return f
+
+def play_features(hand, trick, trump, lead_suit, card):
+    """
+    Features for playing `card`. `trick` holds (relative seat, Card) pairs, where the
+    partner sits at seat 2.
+    """
+    f = np.zeros(PLAY_SIZE)
+    suit = effective_suit(card, trump)
+    lead = lead_suit or suit
+    value = card.value(trump, lead)
+    best_value, best_seat = -1, None
+    for seat, c in trick:
+        v = c.value(trump, lead)
+        if v > best_value:
+            best_value, best_seat = v, seat
+    takes_lead = value > best_value
+    partner_winning = best_seat == 2
+    f[0] = 1
+    f[1] = 1 if suit == trump else 0
+    f[2] = 1 if value >= 199 else 0
+    f[3] = 1 if suit != trump and card.rank == "A" else 0
+    f[4] = 1 if takes_lead else 0
+    f[5] = 1 if partner_winning else 0
+    f[6] = 1 if partner_winning and takes_lead else 0
+    f[7] = 1 if not trick else 0
+    f[8] = 1 if not trick and suit == trump else 0
+    f[9] = 1 if len(trick) == 3 and takes_lead else 0
+    f[10] = value / 200
+    f[11] = 1 if suit != trump and sum(1 for c in hand if effective_suit(c, trump) == suit) == 1 else 0
+    f[12] = sum(1 for c in hand if c is not card and effective_suit(c, trump) == trump) / 5
+    return f
+
+##### ----- WEIGHTS ----- #####
+DEFAULT_WEIGHTS = {
+    "bid": np.array([-2.2, 4.5, 0.6, 0.4, 0.3, 0.2, 0.3, -0.3, 0.5, 0, 0, 0, 0]),
+    "discard": np.array([0, -2.0, -1.0, -0.8, 0.5, -0.3, -3.0]),
+    "play": np.array([0, -0.2, -0.1, 0.3, 1.0, 0.2, -1.2, 0, 0.1, 0.5, -0.5, 0.2, 0.1]),
+}
+
+def load_weights(path, required=False):
+    """
+    Loads a weights file written by `train`. If it does not exist, returns the hand-set
+    defaults, or raises FileNotFoundError when `required`.
+    """
+    if not os.path.exists(path):
+        if required:
+            raise FileNotFoundError(f"no weights file at {path}")
+        return DEFAULT_WEIGHTS
+    with np.load(path) as data:
+        return {k: data[k] for k in DEFAULT_WEIGHTS}
+
+##### ----- AGENT ----- #####
+class LinearEval(Player):
+    """
+    Scores every legal action with a linear model over hand and trick features and
+    takes the best one. Set `weights_path` (on this class or a subclass) to use trained
+    weights; the default path falls back to DEFAULT_WEIGHTS if it does not exist.
+    """
+    default_weights_path = "weights.npz"
+    weights_path = default_weights_path
+    _loaded = {}  # weights by path, shared by every subclass
+
+    @classmethod
+    def weights(cls):
+        path = cls.weights_path
+        if path not in cls._loaded:
+            cls._loaded[path] = load_weights(path, required=path != cls.default_weights_path)
+        return cls._loaded[path]
+
+    def best(self, kind, rows):
+        return int(np.argmax(np.array(rows) @ self.weights()[kind]))
+
+    def choose_trump(self, upcard, first_round):
+        seat = (self.nbr - self.dealer_nbr) % 4
+        if first_round:
+            options = [upcard.suit, None]
+        else:
+            options = [s for s in SUITS if s != upcard.suit] + [None]
+        rows = [bid_features(self.hand, s, upcard, seat, first_round) for s in options]
+        suit = options[self.best("bid", rows)]
+        return (False, None) if suit is None else (True, suit)
+
+    def forced_choose_trump(self, forbidden):
+        options = [s for s in SUITS if s != forbidden]
+        rows = [bid_features(self.hand, s, None, 0, False) for s in options]
+        return options[self.best("bid", rows)]
+
+    def discard(self, trump):
+        rows = [discard_features(self.hand, trump, c) for c in self.hand]
+        return self.hand[self.best("discard", rows)]
+
+    def play_card(self, trick, trump_suit, lead_suit):
+        playable = get_playable_cards(self, trump_suit, lead_suit)
+        if len(playable) == 1:
+            return playable[0]
+        seats = [((p.nbr - self.nbr) % 4, c) for p, c in trick]
+        rows = [play_features(self.hand, seats, trump_suit, lead_suit, c) for c in playable]
+        return playable[self.best("play", rows)]
+
+##### ----- TRAINING ----- #####
+def decision_rows(x, kind, action):
+    """
+    Rebuilds one recorded self-play decision. Returns its weights key, the action
+    features of every legal option, and the index of the option that was taken.
+    """
+    hand = decode_cards(x, HAND)
+    trump = decode_suit(x, TRUMP)
+    if kind == BID:
+        seat = int(np.flatnonzero(x[SEAT])[0])
+        upcard = decode_cards(x, UPCARD)[0]
+        first_round = bool(x[FIRST_ROUND])
+        if first_round:
+            options = [upcard.suit, None]
+        else:
+            options = [s for s in SUITS if s != upcard.suit] + [None]
+        suit = None if action == PASS else SUITS[action]
+        rows = [bid_features(hand, s, upcard, seat, first_round) for s in options]
+        return "bid", rows, options.index(suit)
+    card = card_from_index(action)
+    if kind == DISCARD:
+        options = hand
+        rows = [discard_features(hand, trump, c) for c in options]
+    else:
+        lead = decode_suit(x, LEAD)
+        options = [c for c in hand if effective_suit(c, trump) == lead] if lead else []
+        options = options or hand
+        trick = []
+        for seat, block in ((1, TRICK_LEFT), (2, TRICK_PARTNER), (3, TRICK_RIGHT)):
+            trick.extend((seat, c) for c in decode_cards(x, block))
+        rows = [play_features(hand, trick, trump, lead, c) for c in options]
+    chosen = next(i for i, c in enumerate(options) if c.suit == card.suit and c.rank == card.rank)
+    return "play" if kind == PLAY else "discard", rows, chosen
+
+def train(directory, path, ridge=1.0, prior=1000.0):
+    """
+    Fits the weights of each decision kind from a self-play dataset and writes them to
+    `path`. The round outcome is regressed jointly on a state baseline (the encoded
+    state and the mean features of the legal options) and on how the chosen action's
+    features differ from that mean, so the weights only learn what separates one
+    option from another in the same position, not how strong the position was.
+
+    Only decisions that vary between otherwise similar positions (such as SmartRandom's
+    plays) say anything about which option is better, so the weights are pulled
+    towards DEFAULT_WEIGHTS with strength `prior`; whatever the dataset never explores
+    keeps its hand-set value.
+    """
+    from selfplay import load_shards
+    sizes = {k: 2 * len(w) + FEATURE_SIZE for k, w in DEFAULT_WEIGHTS.items()}
+    gram = {k: ridge * np.eye(n) for k, n in sizes.items()}
+    moment = {k: np.zeros(n) for k, n in sizes.items()}
+    counts = {k: 0 for k in DEFAULT_WEIGHTS}
+    for shard in load_shards(directory):
+        rows = {k: [] for k in DEFAULT_WEIGHTS}
+        targets = {k: [] for k in DEFAULT_WEIGHTS}
+        for x, kind, action, outcome in zip(shard["features"], shard["kinds"], shard["actions"], shard["outcomes"]):
+            key, options, chosen = decision_rows(x, int(kind), int(action))
+            options = np.array(options)
+            mean = options.mean(axis=0)
+            rows[key].append(np.concatenate([options[chosen] - mean, mean, x]))
+            targets[key].append(outcome)
+        for key in rows:
+            if not rows[key]:
+                continue
+            X = np.array(rows[key])
+            y = np.array(targets[key], dtype=float)
+            gram[key] += X.T @ X
+            moment[key] += X.T @ y
+            counts[key] += len(y)
+    weights = {}
+    for k, w in DEFAULT_WEIGHTS.items():
+        n = len(w)
+        gram[k][:n, :n] += prior * np.eye(n)
+        moment[k][:n] += prior * w
+        weights[k] = np.linalg.solve(gram[k], moment[k])[:n]
+    np.savez(path, **weights)
+    for k, n in counts.items():
+        print(f"{k}: fitted on {n} samples")
+    return weights
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train LinearEval weights from a self-play dataset.")
+    parser.add_argument("directory")
+    parser.add_argument("out", help=f"weights file to write (LinearEval loads {LinearEval.weights_path})")
+    parser.add_argument("--ridge", type=float, default=1.0)
+    parser.add_argument("--prior", type=float, default=1000.0, help="pull towards the hand-set weights")
+    args = parser.parse_args()
+    train(args.directory, args.out, args.ridge, args.prior)
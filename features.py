@@ -0,0 +1,80 @@
+import numpy as np
+from cards import *
+
+# Decision kinds
+BID = 0
+DISCARD = 1
+PLAY = 2
+
+# Bid action labels: the index of the called suit in SUITS, or PASS
+PASS = len(SUITS)
+
+# Declaring team, relative to the deciding player
+US = 0
+THEM = 1
+UNDECIDED = 2
+
+##### ----- FEATURE LAYOUT ----- #####
+DECK_SIZE = len(SUITS) * len(RANKS)
+
+HAND = slice(0, 24)
+SEEN = slice(24, 48)
+TRICK_PARTNER = slice(48, 72)
+TRICK_LEFT = slice(72, 96)
+TRICK_RIGHT = slice(96, 120)
+UPCARD = slice(120, 144)
+TRUMP = slice(144, 148)
+LEAD = slice(148, 152)
+SEAT = slice(152, 156)
+DECLARER = slice(156, 159)
+FIRST_ROUND = 159
+KIND = slice(160, 163)
+
+FEATURE_SIZE = 163
+
+def relative_seat(nbr, other_nbr):
+    """
+    Returns how many seats to the left of player `nbr` the player `other_nbr` sits.
+    """
+    return (other_nbr - nbr) % 4
+
+def encode_state(kind, nbr, team, hand, seen, trick, upcard, dealer_nbr,
+                 trump_suit=None, lead_suit=None, declaring_team=None, first_round=False):
+    """
+    Encodes a decision point as a fixed-size uint8 feature vector, from the point of
+    view of player `nbr`. `trick` holds (Player, Card) pairs as passed to play_card.
+    """
+    x = np.zeros(FEATURE_SIZE, dtype=np.uint8)
+    for card in hand:
+        x[HAND.start + card_index(card)] = 1
+    for card in seen:
+        x[SEEN.start + card_index(card)] = 1
+    trick_slots = {2: TRICK_PARTNER, 1: TRICK_LEFT, 3: TRICK_RIGHT}
+    for p, card in trick:
+        x[trick_slots[relative_seat(nbr, p.nbr)].start + card_index(card)] = 1
+    x[UPCARD.start + card_index(upcard)] = 1
+    if trump_suit is not None:
+        x[TRUMP.start + SUITS.index(trump_suit)] = 1
+    if lead_suit is not None:
+        x[LEAD.start + SUITS.index(lead_suit)] = 1
+    x[SEAT.start + relative_seat(dealer_nbr, nbr)] = 1
+    if declaring_team is None:
+        x[DECLARER.start + UNDECIDED] = 1
+    else:
+        x[DECLARER.start + (US if declaring_team == team else THEM)] = 1
+    x[FIRST_ROUND] = 1 if first_round else 0
+    x[KIND.start + kind] = 1
+    return x
+
+def decode_cards(x, block):
+    """
+    Returns the cards marked in a 24-wide block of a feature vector.
+    """
+    return [card_from_index(i) for i in np.flatnonzero(x[block])]
+
+def decode_suit(x, block):
+    """
+    Returns the suit marked in a 4-wide block of a feature vector, or None.
+    """
+    marked = np.flatnonzero(x[block])
+    return SUITS[marked[0]] if len(marked) else None
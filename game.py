@@ -19,6 +19,7 @@ class Round:
                 for i in range(4):
                     p = self.players[(self.dealer_index + 1 + i) % 4]
                     pick, suit = p.choose_trump(upcard, first_round)
+                    self.announce_bid(p, first_round, suit if pick else None)
 
                     if pick:
                         dealer = self.players[self.dealer_index]
@@ -49,6 +50,7 @@ class Round:
 
             dealer = self.players[self.dealer_index]
             self.trump_suit = dealer.forced_choose_trump(upcard.suit)
+            self.announce_bid(dealer, False, self.trump_suit)
             self.declaring_team = dealer.team
             self.trump_chooser = dealer
 
@@ -59,6 +61,7 @@ class Round:
             self.trump_suit = upcard.suit
             self.declaring_team = dealer.team
             self.trump_chooser = dealer
+            self.announce_bid(dealer, True, upcard.suit)
 
             self.logger.log_order_up(dealer, dealer)
 
@@ -68,6 +71,10 @@ class Round:
 
             self.logger.log_pickup_and_discard(dealer, upcard, discard)
 
+    def announce_bid(self, bidder, first_round, suit):
+        for p in self.players:
+            p.observe_bid(bidder, first_round, suit)
+
     def play_trick(self, leader_index):
         trick = []
         lead_suit = None
@@ -78,6 +85,8 @@ class Round:
             trick.append((p, card))
             if lead_suit is None:
                 lead_suit = effective_suit(card, self.trump_suit)
+            for other in self.players:
+                other.observe_card(p, card)
             self.logger.log_card_played(p, card)
 
         winner = max(trick, key=lambda pc: pc[1].value(self.trump_suit, lead_suit))
@@ -0,0 +1,173 @@
+import argparse
+import math
+from multiprocessing import Pool
+
+import numpy as np
+
+from main import agent_class, play_games
+
+# Elo scale: a 400 point gap means 10:1 odds of winning a game
+SCALE = math.log(10) / 400
+
+def expected_score(r_i, r_j):
+    return 1 / (1 + math.exp(-SCALE * (r_i - r_j)))
+
+def entry_name(entry):
+    first, second = entry
+    return first.__name__ if first is second else f"{first.__name__}+{second.__name__}"
+
+def parse_entry(name):
+    """
+    Returns the partnership for an entry like "HighWithCaution" (both seats) or
+    "HighWithCaution+SmartRandom" (one of each).
+    """
+    names = name.split("+")
+    if len(names) == 1:
+        names = names * 2
+    if len(names) != 2:
+        raise ValueError(f"an entry has one or two agents: {name}")
+    return agent_class(names[0]), agent_class(names[1])
+
+def play_match(job):
+    """
+    Plays games `start` to `stop` with partnership `a` as team 0 and `b` as team 1.
+    """
+    a, b, start, stop, fdpu, seed = job
+    wins, _ = play_games(a[0], b[0], a[1], b[1], start, stop, fdpu, seed, logs=False)
+    return wins
+
+class Ladder:
+    """
+    Rates partnerships by Bradley-Terry (on the Elo scale) with a Gaussian prior, and
+    spends each batch of games on the pairings whose outcome is least certain.
+    """
+    def __init__(self, entries, fdpu=False, seed=0, prior=350):
+        self.entries = entries
+        self.names = [entry_name(e) for e in entries]
+        self.fdpu = fdpu
+        self.seed = seed
+        self.prior = prior
+        n = len(entries)
+        self.wins = [[0] * n for _ in range(n)]  # wins[i][j]: games entry i won against j
+        self.next_game = 0
+        self.fit()
+
+    def games(self, i, j):
+        return self.wins[i][j] + self.wins[j][i]
+
+    def fit(self, iterations=25):
+        """
+        Finds the most likely ratings by Newton's method, and their covariance from the
+        curvature of the log-likelihood at that point.
+        """
+        n = len(self.entries)
+        r = np.zeros(n)
+        for _ in range(iterations):
+            grad = -r / self.prior ** 2
+            hess = -np.eye(n) / self.prior ** 2
+            for i in range(n):
+                for j in range(n):
+                    games = self.games(i, j)
+                    if i == j or games == 0:
+                        continue
+                    p = expected_score(r[i], r[j])
+                    grad[i] += SCALE * (self.wins[i][j] - games * p)
+                    info = SCALE ** 2 * games * p * (1 - p)
+                    hess[i, i] -= info
+                    hess[i, j] += info
+            step = np.linalg.solve(hess, grad)
+            r -= step
+            if np.max(np.abs(step)) < 1e-3:
+                break
+        # Only rating differences are meaningful, so report ratings relative to their mean
+        centering = np.eye(n) - np.ones((n, n)) / n
+        self.ratings = r - r.mean()
+        self.covariance = centering @ np.linalg.inv(-hess) @ centering
+
+    def uncertainty(self):
+        return np.sqrt(np.maximum(np.diag(self.covariance), 0))
+
+    def information(self, i, j):
+        """
+        How much one more game between i and j would shrink the variance of their
+        rating difference.
+        """
+        variance = self.covariance[i, i] + self.covariance[j, j] - 2 * self.covariance[i, j]
+        p = expected_score(self.ratings[i], self.ratings[j])
+        info = SCALE ** 2 * p * (1 - p)
+        return variance ** 2 * info / (1 + variance * info)
+
+    def schedule(self, pairings):
+        """
+        Returns the `pairings` most informative pairs of entries.
+        """
+        n = len(self.entries)
+        pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+        pairs.sort(key=lambda ij: self.information(*ij), reverse=True)
+        return pairs[:pairings]
+
+    def play_batch(self, pool, pairings, batch_games):
+        """
+        Plays `batch_games` games on each scheduled pairing, half with each partnership
+        seated as team 0, and refits the ratings. With an odd batch the odd game goes to
+        each seating in turn.
+        """
+        if batch_games < 1:
+            raise ValueError(f"a batch needs at least one game per pairing, not {batch_games}")
+        jobs = []
+        for i, j in self.schedule(pairings):
+            if self.games(i, j) % 2:
+                i, j = j, i
+            for a, b, count in ((i, j, (batch_games + 1) // 2), (j, i, batch_games // 2)):
+                if count == 0:
+                    continue
+                jobs.append((a, b, self.next_game, self.next_game + count))
+                self.next_game += count
+        results = pool.map(play_match, [
+            (self.entries[a], self.entries[b], start, stop, self.fdpu, self.seed)
+            for a, b, start, stop in jobs
+        ])
+        for (a, b, _, _), wins in zip(jobs, results):
+            self.wins[a][b] += wins[0]
+            self.wins[b][a] += wins[1]
+        self.fit()
+
+    def run(self, batch_games=20, pairings=None, workers=None, tolerance=25, max_games=10000):
+        """
+        Plays batches until every rating's standard deviation is below `tolerance` or
+        `max_games` games have been played.
+        """
+        if batch_games < 1:
+            raise ValueError(f"a batch needs at least one game per pairing, not {batch_games}")
+        pairings = pairings or max(1, len(self.entries) // 2)
+        with Pool(workers) as pool:
+            while self.next_game < max_games and max(self.uncertainty()) >= tolerance:
+                self.play_batch(pool, pairings, batch_games)
+                print(f"{self.next_game} games played, largest uncertainty ±{round(max(self.uncertainty()))}")
+        self.report()
+
+    def report(self):
+        order = sorted(range(len(self.entries)), key=lambda i: self.ratings[i], reverse=True)
+        uncertainty = self.uncertainty()
+        width = max(len(name) for name in self.names)
+        print()
+        for rank, i in enumerate(order, start=1):
+            games = sum(self.games(i, j) for j in range(len(self.entries)))
+            print(f"{rank:>2}. {self.names[i]:<{width}}  {round(self.ratings[i]):>5} ±{round(uncertainty[i]):<4} ({games} games)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank agents and partnerships with an adaptive rating ladder.")
+    parser.add_argument("entries", nargs="+", help='agents, or partnerships like "HighWithCaution+SmartRandom"')
+    parser.add_argument("--batch", type=int, default=20, help="games per scheduled pairing in each batch")
+    parser.add_argument("--pairings", type=int, help="pairings scheduled per batch")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--tolerance", type=float, default=25, help="stop once every rating is within ± this")
+    parser.add_argument("--max-games", type=int, default=10000)
+    parser.add_argument("--fdpu", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.batch < 1:
+        parser.error("--batch must be at least 1")
+
+    ladder = Ladder([parse_entry(name) for name in args.entries], args.fdpu, args.seed)
+    ladder.run(args.batch, args.pairings, args.workers, args.tolerance, args.max_games)
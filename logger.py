@@ -59,3 +59,40 @@ class Logger:
 
         with open(filepath, "w") as f:
             f.write("\n".join(self.lines))
+
+class NullLogger(Logger):
+    """
+    Logger that keeps no text. Subclasses override the hooks they need to follow the game.
+    """
+    def __init__(self):
+        self.round_number = 0
+
+    def start_round(self, round_num, dealer, hands, upcard):
+        self.round_number = round_num
+
+    def log_order_up(self, chooser, dealer):
+        pass
+
+    def log_pickup_and_discard(self, dealer, upcard, discard):
+        pass
+
+    def log_call_trump(self, chooser, suit):
+        pass
+
+    def log_forced_trump(self, dealer, suit):
+        pass
+
+    def log_final_trump(self, suit, chooser):
+        pass
+
+    def log_card_played(self, player, card):
+        pass
+
+    def log_trick_winner(self, player, card):
+        pass
+
+    def log_round_end(self, tricks, declaring_team, scores):
+        pass
+
+    def save(self):
+        pass
@@ -1,16 +1,39 @@
 from player import *
 from engine import GameEngine
 from logger import Logger
+from replay import GameRecorder, write_archive
+from result_cache import ResultCache, competition_key
 from datetime import datetime
+import argparse
+import importlib
+import json
 import os
 
-def competition(P1: Player, P2: Player, P3: Player, P4: Player, game_count: int, fdpu=False, directory=None, logs=True):
-    print(f"Playing {game_count} games...", end="")
-    game_nbr = 1
+def agent_class(name):
+    """
+    Returns the agent class called `name`: either a class in player.py or a
+    "module.Class" path such as "evaluator.LinearEval".
+    """
+    module, _, cls = name.rpartition(".")
+    return getattr(importlib.import_module(module or "player"), cls)
+
+def play_games(P1: Player, P2: Player, P3: Player, P4: Player, start: int, stop: int, fdpu=False, seed=None, directory=None, logs=True, archive=None):
+    """
+    Plays games `start` (inclusive) to `stop` (exclusive) and returns the wins and points
+    of each team. If `seed` is given, game n is played with the random module seeded to
+    `seed + n`, so any range of games gives the same results wherever it is played.
+    If `archive` is a list, the compact encoding of each game is appended to it.
+    """
     points = {0: 0, 1: 0}
     wins = {0: 0, 1: 0}
-    for _ in range(game_count):
-        logger = Logger(filename=f"game{game_nbr}-{datetime.now().strftime('%m-%d-%y-%I:%M%p')}.txt", directory=directory)
+    for game in range(start, stop):
+        if seed is not None:
+            random.seed(seed + game)
+        filename = f"game{game + 1}-{datetime.now().strftime('%m-%d-%y-%I:%M%p')}.txt"
+        if archive is None:
+            logger = Logger(filename=filename, directory=directory)
+        else:
+            logger = GameRecorder(fdpu, filename=filename, directory=directory)
         players = [
             P1(1, 3, team=0),
             P2(2, 4, team=1),
@@ -23,24 +46,152 @@ def competition(P1: Player, P2: Player, P3: Player, P4: Player, game_count: int,
             if score >= 10: wins[team] += 1
             points[team] += score
         if logs: logger.save()
-        game_nbr += 1
-    print(f" done!")
+        if archive is not None: archive.append(logger.encode())
+    return wins, points
+
+def cached_play_games(P1: Player, P2: Player, P3: Player, P4: Player, game_count: int, fdpu=False, seed=0, cache=None, directory=None, logs=True):
+    """
+    Like play_games over games 0 to `game_count`, but reuses results stored in `cache`
+    and only plays (and logs) the ranges of games it is missing.
+    """
+    cache = cache or ResultCache()
+    agents = [P1, P2, P3, P4]
+    key = competition_key(agents, fdpu, seed)
+    meta = {"agents": [A.__name__ for A in agents], "fdpu": fdpu, "seed": seed}
+    points = {0: 0, 1: 0}
+    wins = {0: 0, 1: 0}
+    for start, stop, cached in cache.plan(key, game_count):
+        if cached:
+            w, p = cache.load(key, start, stop)
+        else:
+            w, p = play_games(P1, P2, P3, P4, start, stop, fdpu, seed, directory, logs)
+            cache.store(key, start, stop, w, p, meta)
+        for team in (0, 1):
+            wins[team] += w[team]
+            points[team] += p[team]
+    return wins, points
+
+def save_checkpoint(path, checkpoint):
+    """
+    Writes a checkpoint atomically, so an interruption never leaves a partial file.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(path + ".tmp", path)
+
+def resumable_play_games(P1: Player, P2: Player, P3: Player, P4: Player, game_count: int, fdpu=False, seed=None, directory=None, logs=True, archive=None, checkpoint="checkpoint.json", checkpoint_every=100, resume=False):
+    """
+    Plays games 0 to `game_count` in chunks of `checkpoint_every`, writing the totals,
+    the random module's state and the archive length to `checkpoint` after each chunk.
+    With `resume`, play continues from the checkpoint and ends with the same results an
+    uninterrupted run would have produced.
+    """
+    settings = {
+        "agents": [A.__name__ for A in (P1, P2, P3, P4)],
+        "game_count": game_count,
+        "fdpu": fdpu,
+        "seed": seed,
+    }
+    points = {0: 0, 1: 0}
+    wins = {0: 0, 1: 0}
+    next_game = 0
+    # Like the other paths, a fresh run appends to an existing archive
+    archive_size = os.path.getsize(archive) if archive and os.path.exists(archive) else 0
+    resuming = resume and os.path.exists(checkpoint)
+    if resuming:
+        with open(checkpoint) as f:
+            saved = json.load(f)
+        if saved["settings"] != settings:
+            raise ValueError(f"{checkpoint} was written by a run with different settings: {saved['settings']}")
+        next_game = saved["next_game"]
+        wins = {int(t): w for t, w in saved["wins"].items()}
+        points = {int(t): p for t, p in saved["points"].items()}
+        version, state, gauss = saved["rng_state"]
+        random.setstate((version, tuple(state), gauss))
+        archive_size = saved["archive_size"]
+        print(f" resuming at game {next_game + 1}...", end="")
+    if archive and resuming:
+        # Drop any games archived after the checkpoint was written
+        with open(archive, "ab") as f:
+            f.truncate(archive_size)
 
-    print(f"Team 0 Wins: {wins[0]}")
-    print(f"Team 0 Avg Points: {round(points[0] / game_count, 3)}")
-    print(f"Team 1 Wins: {wins[1]}")
-    print(f"Team 1 Avg Points: {round(points[1] / game_count, 3)}")
+    while next_game < game_count:
+        stop = min(next_game + checkpoint_every, game_count)
+        games = [] if archive else None
+        w, p = play_games(P1, P2, P3, P4, next_game, stop, fdpu, seed, directory, logs, games)
+        for team in (0, 1):
+            wins[team] += w[team]
+            points[team] += p[team]
+        if archive:
+            write_archive(archive, games)
+            archive_size = os.path.getsize(archive)
+        next_game = stop
+        save_checkpoint(checkpoint, {
+            "settings": settings,
+            "next_game": next_game,
+            "wins": wins,
+            "points": points,
+            "rng_state": random.getstate(),
+            "archive_size": archive_size,
+        })
+    return wins, points
+
+def report(wins, points, game_count, directory=None):
+    """
+    Prints the results of a competition and, if `directory` is given, writes them to
+    its 00summary.txt.
+    """
+    lines = [
+        f"Team 0 Wins: {wins[0]}",
+        f"Team 0 Avg Points: {round(points[0] / game_count, 3)}",
+        f"Team 1 Wins: {wins[1]}",
+        f"Team 1 Avg Points: {round(points[1] / game_count, 3)}",
+    ]
+    for line in lines:
+        print(line)
 
     if directory:
         os.makedirs(directory, exist_ok=True)
         filepath = os.path.join(directory, "00summary.txt")
+        with open(filepath, "w") as f:
+            for line in lines:
+                f.write(line + "\n")
 
-    with open(filepath, "w") as f:
-        f.write(f"Team 0 Wins: {wins[0]}\n")
-        f.write(f"Team 0 Avg Points: {round(points[0] / game_count, 3)}\n")
-        f.write(f"Team 1 Wins: {wins[1]}\n")
-        f.write(f"Team 1 Avg Points: {round(points[1] / game_count, 3)}\n")
+def competition(P1: Player, P2: Player, P3: Player, P4: Player, game_count: int, fdpu=False, directory=None, logs=True, seed=None, cache=None, archive=None, checkpoint=None, checkpoint_every=100, resume=False):
+    if checkpoint is not None and cache is not None:
+        raise ValueError("a competition can use a checkpoint or the result cache, not both")
+    if archive and cache is not None:
+        # The cache keeps only results, so cached games could not be archived
+        raise ValueError("a competition can write an archive or use the result cache, not both")
+    print(f"Playing {game_count} games...", end="")
+    games = [] if archive else None
+    if checkpoint is not None:
+        wins, points = resumable_play_games(P1, P2, P3, P4, game_count, fdpu, seed, directory, logs, archive, checkpoint, checkpoint_every, resume)
+        games = None
+    elif cache is not None:
+        # Cached results are only meaningful for seeded games
+        seed = 0 if seed is None else seed
+        wins, points = cached_play_games(P1, P2, P3, P4, game_count, fdpu, seed, cache, directory, logs)
+    else:
+        wins, points = play_games(P1, P2, P3, P4, 0, game_count, fdpu, seed, directory, logs, games)
+    if games is not None:
+        write_archive(archive, games)
+    print(f" done!")
+    report(wins, points, game_count, directory)
     
     
 if __name__ == "__main__":
-    competition(HighWithCaution, SmartRandom, HighWithCaution, SmartRandom, 1000, fdpu=False, directory="Logs/Test1", logs=False)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run a competition between agents.")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--directory", default="Logs/Test1")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <directory>/checkpoint.json)")
+    parser.add_argument("--checkpoint-every", type=int, default=100)
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint")
+    args = parser.parse_args()
+
+    checkpoint = args.checkpoint or os.path.join(args.directory, "checkpoint.json")
+    competition(HighWithCaution, SmartRandom, HighWithCaution, SmartRandom, args.games, fdpu=False, directory=args.directory, logs=False,
+                checkpoint=checkpoint, checkpoint_every=args.checkpoint_every, resume=args.resume)
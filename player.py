@@ -1,6 +1,6 @@
 import random
-import itertools
 from cards import *
+import rollout
 class Player:
     def __init__(self, number: int, teammate: int, team: int):
         self.nbr = number
@@ -8,6 +8,8 @@ class Player:
         self.team = team
         self.hand = []
         self.declaring_team = None
+        self.dealer_nbr = None
+        self.upcard = None
         self.tricks_won = 0
 
     def set_hand(self, cards):
@@ -36,6 +38,14 @@ class Player:
     def reset(self):
         pass
 
+    # Agents may use these functions to track the bids and cards of other players.
+    # `suit` is None when the bidder passed.
+    def observe_bid(self, bidder, first_round: bool, suit: str | None):
+        pass
+
+    def observe_card(self, player, card: Card):
+        pass
+
     # Override the following methods to create an agent
 
     def choose_trump(self, upcard: Card, first_round: bool):
@@ -85,6 +95,9 @@ def get_playable_cards(self: Player, trump_suit: str, lead_suit: str | None):
     return playable if playable else list(self.hand)
 
 ##### ----- CHOOSE TRUMP FUNCTIONS ----- #####
+# rollout.py copies choose_ge3, forced_choose_max_suit_count,
+# discard_lowest_nontrump_rank and HighWithCaution.play_card for MonteCarlo's
+# playouts; any change to them must be mirrored there.
 def choose_ge3(self: Player, upcard: Card, first_round: bool):
     """
     Round 1: Order up dealer if player has 3 or more cards of the upcard suit. \\
@@ -116,7 +129,7 @@ def play_highest_value(self, trump_suit: str, lead_suit: str):
     Play the card with the highest value.
     """
     playable = get_playable_cards(self, trump_suit, lead_suit)
-    playable.sort(key=lambda x: x.value(trump_suit, lead_suit), reverse=True)
+    playable.sort(key=lambda x: (x.value(trump_suit, lead_suit), x.index), reverse=True)
     return playable[0]
 
 def play_lowest_value(self, trump_suit: str, lead_suit: str):
@@ -124,7 +137,7 @@ def play_lowest_value(self, trump_suit: str, lead_suit: str):
     Play the card with the lowest value.
     """
     playable = get_playable_cards(self, trump_suit, lead_suit)
-    playable.sort(key=lambda x: x.value(trump_suit, lead_suit), reverse=False)
+    playable.sort(key=lambda x: (x.value(trump_suit, lead_suit), x.index))
     return playable[0]
 
 def play_lowest_winner(self, trump_suit: str, lead_suit: str, current_winner: Card):
@@ -133,7 +146,7 @@ def play_lowest_winner(self, trump_suit: str, lead_suit: str, current_winner: Ca
     can win then play the lowest valued card.
     """
     playable = get_playable_cards(self, trump_suit, lead_suit)
-    playable.sort(key=lambda x: x.value(trump_suit, lead_suit), reverse=False)
+    playable.sort(key=lambda x: (x.value(trump_suit, lead_suit), x.index))
     winner_value = current_winner.value(trump_suit, lead_suit)
     for c in playable:
         if c.value(trump_suit, lead_suit) > winner_value:
@@ -147,7 +160,7 @@ def discard_lowest_nontrump_rank(self: Player, trump: str):
     Discard the lowest rank card that is not of the trump suit. If all cards are of
     the trump suit, discard the lowest rank card.
     """
-    sorted_hand = sorted(self.hand, key=lambda x: x.rank)
+    sorted_hand = sorted(self.hand, key=lambda x: (x.rank, x.index))
     for card in sorted_hand:
         if card.suit != trump:
             return card
@@ -194,6 +207,7 @@ class LowValue(Player):
         return play_lowest_value(self, trump_suit, lead_suit)
 
 class HighWithCaution(Player):
+    # rollout.caution_play copies play_card; keep the two in step
     def choose_trump(self, upcard, first_round):
         return choose_ge3(self, upcard, first_round)
     
@@ -210,59 +224,286 @@ class HighWithCaution(Player):
         return play_lowest_value(self, trump_suit, lead_suit)
     
 class MonteCarlo(Player):
+    # Model of the other players' bidding and discarding, used to weight sampled deals
+    bid_model = staticmethod(choose_ge3)
+    forced_bid_model = staticmethod(forced_choose_max_suit_count)
+    discard_model = staticmethod(discard_lowest_nontrump_rank)
+    bid_noise = 0.1
+    samples = 1000
+    # Deals sampled per bidding or discard decision, shared by all of its options
+    bid_samples = 500
+
     def __init__(self, number, teammate, team):
         super().__init__(number, teammate, team)
 
     def reset(self):
-        self.other_cards = set(itertools.product(SUITS, RANKS))
-        for card in self.hand:
-            self.other_cards.discard((card.suit, card.rank))
+        self.tricks_won = 0
+        self.initial_hand = [c.index for c in self.hand]
+        self.bids = []
+        self.trump_suit = None
+        self.picked_up = False
+        self.caller = None
+        self.played = {p: [] for p in range(1, 5)}
+        self.voids = []
+        self.current_trick = []
+        self.discarded = []
+        self.deals = []
+
+    def observe_bid(self, bidder, first_round, suit):
+        self.bids.append((bidder.nbr, first_round, suit))
+        if suit is not None:
+            self.trump_suit = suit
+            self.picked_up = first_round
+            self.caller = bidder.nbr
+
+    def observe_card(self, player, card):
+        if self.current_trick and player.nbr != self.nbr:
+            lead_suit = effective_suit(self.current_trick[0], self.trump_suit)
+            if effective_suit(card, self.trump_suit) != lead_suit:
+                # The player held no card of the lead suit that they had not played yet
+                self.voids.append((player.nbr, lead_suit, len(self.played[player.nbr])))
+        self.played[player.nbr].append(card.index)
+        self.current_trick.append(card)
+        if len(self.current_trick) == 4:
+            self.current_trick = []
     
     def choose_trump(self, upcard, first_round):
-        # TODO: Make this a Monte Carlo process
-        return choose_ge3(self, upcard, first_round)
+        seat = self.nbr - 1
+        dealer = self.dealer_nbr - 1
+        if first_round:
+            options = [upcard.suit, None]
+        else:
+            options = [s for s in SUITS if s != upcard.suit] + [None]
+
+        bid, forced_bid, discard = self.rollout_models()
+
+        def outcome(hands, option):
+            if option is None:
+                trump, declarer, picked_up = rollout.finish_bidding(hands, dealer, upcard.index, first_round, seat, bid, forced_bid)
+            else:
+                trump, declarer, picked_up = SUITS.index(option), seat, first_round
+            return rollout.round_score(hands, dealer, upcard.index, trump, declarer, picked_up, seat, discard_policy=discard)
+
+        best = self.search(options, outcome)
+        return (False, None) if best is None else (True, best)
     
     def forced_choose_trump(self, forbidden):
-        # TODO: Make this a Monte Carlo process
-        return forced_choose_max_suit_count(self, forbidden)
+        seat = self.nbr - 1
+        options = [s for s in SUITS if s != forbidden]
+
+        def outcome(hands, option):
+            return rollout.round_score(hands, seat, self.upcard.index, SUITS.index(option), seat, False, seat)
+
+        return self.search(options, outcome)
     
     def discard(self, trump):
-        # TODO: Maybe make this a Monte Carlo process?
-        return discard_lowest_nontrump_rank(self, trump)
+        seat = self.nbr - 1
+        trump_index = SUITS.index(trump)
+        declarer = self.caller - 1 if self.caller is not None else seat
+
+        def outcome(hands, option):
+            hands[seat] = [i for i in hands[seat] if i != option.index]
+            return rollout.round_score(hands, seat, self.upcard.index, trump_index, declarer, False, seat)
+
+        card = self.search(list(self.hand), outcome)
+        self.discarded = [card.index]
+        return card
+
+    def rollout_models(self):
+        """
+        Returns the bid, forced bid and discard models in the index form rollout.py
+        plays with: its fast copies for the default models, otherwise wrappers around
+        the configured ones, so deals are played out under the same models they are
+        weighted by.
+        """
+        bid = rollout.ge3_bid if self.bid_model is choose_ge3 else self.index_bid
+        forced_bid = rollout.max_suit_count if self.forced_bid_model is forced_choose_max_suit_count else self.index_forced_bid
+        discard = rollout.lowest_rank_discard if self.discard_model is discard_lowest_nontrump_rank else self.index_discard
+        return bid, forced_bid, discard
+
+    def index_bid(self, hand, upcard, first_round):
+        model_player = Player(0, 0, 0)
+        model_player.hand = [DECK[i] for i in hand]
+        pick, suit = self.bid_model(model_player, DECK[upcard], first_round)
+        return SUITS.index(suit) if pick else None
+
+    def index_forced_bid(self, hand, forbidden):
+        model_player = Player(0, 0, 0)
+        model_player.hand = [DECK[i] for i in hand]
+        return SUITS.index(self.forced_bid_model(model_player, SUITS[forbidden]))
+
+    def index_discard(self, hand, trump):
+        model_player = Player(0, 0, 0)
+        model_player.hand = [DECK[i] for i in hand]
+        return self.discard_model(model_player, SUITS[trump]).index
+
+    def search(self, options, outcome):
+        """
+        Evaluates every option on the same set of sampled deals, weighted by how well
+        each deal explains the bids so far, and returns the option with the best mean
+        outcome. `outcome(hands, option)` gets the hands of seats 0-3 as card indices.
+        """
+        seat = self.nbr - 1
+        known = set(self.initial_hand) | {self.upcard.index}
+        unknown = [i for i in range(24) if i not in known]
+        others = [p for p in range(1, 5) if p != self.nbr]
+        samples = []
+        for _ in range(self.bid_samples):
+            random.shuffle(unknown)
+            hands = [None] * 4
+            for k, p in enumerate(others):
+                hands[p - 1] = unknown[5 * k:5 * k + 5]
+            weight = self.bid_weight({p: [DECK[i] for i in hands[p - 1]] for p in others})
+            results = []
+            for option in options:
+                hands[seat] = [c.index for c in self.hand]
+                results.append(outcome(list(hands), option))
+            samples.append((weight, results))
+        if not any(weight for weight, _ in samples):
+            # The bid model explains none of the deals, so count them all equally
+            samples = [(1.0, results) for _, results in samples]
+        totals = [sum(weight * results[j] for weight, results in samples) for j in range(len(options))]
+        return options[totals.index(max(totals))]
     
     def play_card(self, trick, trump_suit, lead_suit):
-        card_count = len(self.hand)
-        cards_per_player = {p: card_count for p in range(1, 5)}
-        for player, card in trick:
-            self.other_cards.discard((card.suit, card.rank))
-            cards_per_player[player.nbr] -= 1
         playable = get_playable_cards(self, trump_suit, lead_suit)
         if len(playable) == 1:
             return playable[0]
+        self.update_deals()
+        if not self.deals:
+            return play_lowest_value(self, trump_suit, lead_suit)
         mc_results = []
         trick_wins = {self.team: self.tricks_won, 1 - self.team: 5 - len(self.hand) - self.tricks_won}
         for card in playable:
-            mc_results.append(self.monte_carlo(trick, trump_suit, lead_suit, cards_per_player, card, trick_wins))
+            mc_results.append(self.monte_carlo(trick, trump_suit, lead_suit, card, trick_wins))
         max_index = mc_results.index(max(mc_results))
         return playable[max_index]
 
-    def monte_carlo(self, trick, trump_suit, lead_suit, cards_per_player, card_to_play, trick_wins):
-        partial_deck = [Card(pair[0], pair[1]) for pair in self.other_cards]
-        players = {1: HighWithCaution(1, 3, 0), 2: HighWithCaution(2, 4, 1), 3: HighWithCaution(3, 1, 0), 4: HighWithCaution(4, 2, 0)}
+    ##### ----- DEAL SAMPLING ----- #####
+    # A deal maps each other player to the hand they held after bidding. Deals are
+    # weighted by how likely the bids observed this round were under the bid model,
+    # and are kept for the rest of the round while they agree with the cards played.
+
+    def bid_weight(self, initial_hands):
+        """
+        Returns the likelihood of the observed bids given the other players' dealt hands.
+        """
+        weight = 1.0
+        model_player = Player(0, 0, 0)
+        dealer_passed = False
+        for i, (nbr, first_round, suit) in enumerate(self.bids):
+            forced = not first_round and nbr == self.dealer_nbr and dealer_passed
+            if not first_round and nbr == self.dealer_nbr:
+                dealer_passed = True
+            if i == 0 and nbr == self.dealer_nbr:
+                break  # the dealer was forced to pick up, nobody else bid
+            if nbr == self.nbr:
+                continue
+            model_player.hand = initial_hands[nbr]
+            if forced:
+                predicted = self.forced_bid_model(model_player, self.upcard.suit)
+            else:
+                pick, predicted = self.bid_model(model_player, self.upcard, first_round)
+                predicted = predicted if pick else None
+            weight *= 1 - self.bid_noise if predicted == suit else self.bid_noise
+        return weight
+
+    def is_consistent(self, hands):
+        """
+        Checks that a deal agrees with every card the other players have played.
+        """
+        return all(self.hand_is_consistent(nbr, hand) for nbr, hand in hands.items())
+
+    def hand_is_consistent(self, nbr, hand):
+        held = {c.index for c in hand}
+        if not held.issuperset(self.played[nbr]):
+            return False
+        for void_nbr, suit, plays_before in self.voids:
+            if void_nbr != nbr:
+                continue
+            already_played = self.played[nbr][:plays_before]
+            for c in hand:
+                if effective_suit(c, self.trump_suit) == suit and c.index not in already_played:
+                    return False
+        return True
+
+    def sample_deal(self):
+        """
+        Samples the other players' hands given the cards they have played and the suits
+        they have shown out of, and returns them with their bid weight.
+        """
+        others = [p for p in range(1, 5) if p != self.nbr]
+        void_suits = {p: {suit for nbr, suit, _ in self.voids if nbr == p} for p in others}
+        dealer_has_upcard = self.picked_up and self.dealer_nbr != self.nbr
+        fixed = {}
+        for p in others:
+            fixed[p] = [i for i in self.played[p] if not (dealer_has_upcard and p == self.dealer_nbr and i == self.upcard.index)]
+        taken = set(self.initial_hand + self.discarded) | {self.upcard.index} | {i for p in others for i in fixed[p]}
+        pool = [i for i in range(24) if i not in taken]
+        random.shuffle(pool)
+        initial_hands = {}
+        for p in others:
+            if dealer_has_upcard and p == self.dealer_nbr:
+                free = pool  # the dealer's discard may be of a suit they later showed out of
+            else:
+                free = [i for i in pool if effective_suit(DECK[i], self.trump_suit) not in void_suits[p]]
+            needed = 5 - len(fixed[p])
+            if len(free) < needed:
+                return None, 0
+            chosen = free[:needed]
+            pool = [i for i in pool if i not in chosen]
+            initial_hands[p] = [DECK[i] for i in fixed[p] + chosen]
+
+        hands = dict(initial_hands)
+        weight = self.bid_weight(initial_hands)
+        if dealer_has_upcard:
+            # Prefer the discard the model predicts, but the dealer may have kept a card
+            # the model would have discarded
+            dealer = Player(self.dealer_nbr, 0, 0)
+            dealer.hand = initial_hands[self.dealer_nbr] + [DECK[self.upcard.index]]
+            predicted = self.discard_model(dealer, self.trump_suit)
+            for discard in [predicted] + [c for c in dealer.hand if c is not predicted]:
+                hand = [c for c in dealer.hand if c is not discard]
+                if self.hand_is_consistent(self.dealer_nbr, hand):
+                    break
+            else:
+                return None, 0
+            hands[self.dealer_nbr] = hand
+            if discard is not predicted:
+                weight *= self.bid_noise
+        if not self.is_consistent(hands):
+            return None, 0
+        return hands, weight
+
+    def update_deals(self):
+        """
+        Drops kept deals that the latest plays contradict and tops the pool back up.
+        """
+        self.deals = [(hands, w) for hands, w in self.deals if self.is_consistent(hands)]
+        if len(self.deals) < self.samples // 2:
+            attempts = 0
+            while len(self.deals) < self.samples and attempts < 20 * self.samples:
+                attempts += 1
+                hands, weight = self.sample_deal()
+                if hands is not None:
+                    self.deals.append((hands, weight))
+        if not any(w for _, w in self.deals):
+            # The bid model explains none of the deals, so count them all equally
+            self.deals = [(hands, 1.0) for hands, _ in self.deals]
+
+    def monte_carlo(self, trick, trump_suit, lead_suit, card_to_play, trick_wins):
+        players = {1: HighWithCaution(1, 3, 0), 2: HighWithCaution(2, 4, 1), 3: HighWithCaution(3, 1, 0), 4: HighWithCaution(4, 2, 1)}
+        played = {i for cards in self.played.values() for i in cards}
         score_sum = 0
-        for _ in range(1000):
+        weight_sum = 0
+        for hands, weight in self.deals:
             sim_trick = trick.copy()
             sim_lead_suit = lead_suit
             sim_trick_wins = trick_wins.copy()
             # Assign players their cards
             players[self.nbr].set_hand(self.hand.copy())
-            pdc = partial_deck.copy()
-            random.shuffle(pdc)
-            for p in range(1, 5):
-                if p == self.nbr: continue
-                card_count = cards_per_player[p]
-                players[p].set_hand(pdc[-card_count:].copy())
-                del pdc[-card_count:]
+            for p, hand in hands.items():
+                players[p].set_hand([c for c in hand if c.index not in played])
             
             # Finish the current trick
             for card in players[self.nbr].hand:
@@ -311,5 +552,6 @@ class MonteCarlo(Player):
             else:
                 scores[opp_team] += 2
 
-            score_sum += scores[self.team]
-        return score_sum / 1000
\ No newline at end of file
+            score_sum += weight * scores[self.team]
+            weight_sum += weight
+        return score_sum / weight_sum
\ No newline at end of file
@@ -0,0 +1,342 @@
+import argparse
+from math import comb
+
+from cards import *
+from logger import Logger
+
+##### ----- MIXED-RADIX CODEC ----- #####
+# A game is stored as one integer in which each decision is a digit whose radix is the
+# number of options it had. The replay engine knows every radix from the state it has
+# rebuilt so far, so no digit needs more room than it uses.
+
+class RadixWriter:
+    def __init__(self):
+        self.value = 0
+        self.scale = 1
+
+    def write(self, digit, radix):
+        if not 0 <= digit < radix:
+            raise ValueError(f"digit {digit} out of range for radix {radix}")
+        self.value += digit * self.scale
+        self.scale *= radix
+
+    def to_bytes(self):
+        return self.value.to_bytes((self.scale.bit_length() + 7) // 8, "little")
+
+class RadixReader:
+    def __init__(self, data):
+        self.value = int.from_bytes(data, "little")
+
+    def read(self, radix):
+        self.value, digit = divmod(self.value, radix)
+        return digit
+
+def rank_subset(positions):
+    """
+    Returns the colexicographic rank of a sorted list of distinct positions.
+    """
+    return sum(comb(p, i + 1) for i, p in enumerate(positions))
+
+def unrank_subset(rank, size):
+    positions = []
+    for k in range(size, 0, -1):
+        p = k - 1
+        while comb(p + 1, k) <= rank:
+            p += 1
+        rank -= comb(p, k)
+        positions.append(p)
+    return positions[::-1]
+
+def legal_options(hand, trump_suit, lead_suit):
+    """
+    Returns the sorted card indices of `hand` that may legally be played.
+    """
+    if lead_suit is not None:
+        following = [i for i in hand if effective_suit(DECK[i], trump_suit) == lead_suit]
+        if following:
+            return sorted(following)
+    return sorted(hand)
+
+def round_two_options(upcard_suit):
+    return [s for s in SUITS if s != upcard_suit]
+
+##### ----- RECORDING ----- #####
+class GameRecorder(Logger):
+    """
+    Logger that also encodes the game as the deal of each round plus the index of every
+    decision among its legal options. Hands are kept in card index order, so the
+    encoding does not depend on how agents ordered their cards.
+    """
+    def __init__(self, force_dealer_pick_up=False, filename=None, directory=None):
+        super().__init__(filename, directory)
+        self.force_dealer_pick_up = force_dealer_pick_up
+        self.writer = RadixWriter()
+        self.started = False
+
+    def start_round(self, round_num, dealer, hands, upcard):
+        super().start_round(round_num, dealer, hands, upcard)
+        self.dealer = dealer.nbr - 1
+        if not self.started:
+            self.writer.write(1 if self.force_dealer_pick_up else 0, 2)
+            self.writer.write(self.dealer, 4)
+            self.started = True
+        self.hands = {p.nbr - 1: sorted(c.index for c in p.hand) for p in hands}
+        pool = list(range(24))
+        for seat in range(4):
+            positions = [pool.index(i) for i in self.hands[seat]]
+            self.writer.write(rank_subset(positions), comb(len(pool), 5))
+            pool = [i for i in pool if i not in self.hands[seat]]
+        self.writer.write(pool.index(upcard.index), len(pool))
+        self.upcard = upcard
+        self.trump_suit = None
+        self.lead_suit = None
+        self.cards_played = 0
+
+    def write_passes(self, count, radix):
+        for _ in range(count):
+            self.writer.write(0, radix)
+
+    def bidders_before(self, seat):
+        return (seat - self.dealer - 1) % 4
+
+    def log_order_up(self, chooser, dealer):
+        super().log_order_up(chooser, dealer)
+        if not self.force_dealer_pick_up:
+            self.write_passes(self.bidders_before(chooser.nbr - 1), 2)
+            self.writer.write(1, 2)
+        self.trump_suit = self.upcard.suit
+
+    def log_pickup_and_discard(self, dealer, upcard, discard):
+        super().log_pickup_and_discard(dealer, upcard, discard)
+        hand = sorted(self.hands[self.dealer] + [upcard.index])
+        self.writer.write(hand.index(discard.index), len(hand))
+        hand.remove(discard.index)
+        self.hands[self.dealer] = hand
+
+    def log_call_trump(self, chooser, suit):
+        super().log_call_trump(chooser, suit)
+        options = round_two_options(self.upcard.suit)
+        if suit not in options:
+            raise ValueError(f"P{chooser.nbr} called the turned down suit {suit}")
+        self.write_passes(4, 2)
+        self.write_passes(self.bidders_before(chooser.nbr - 1), 4)
+        self.writer.write(options.index(suit) + 1, 4)
+        self.trump_suit = suit
+
+    def log_forced_trump(self, dealer, suit):
+        super().log_forced_trump(dealer, suit)
+        self.write_passes(4, 2)
+        self.write_passes(4, 4)
+        self.writer.write(round_two_options(self.upcard.suit).index(suit), 3)
+        self.trump_suit = suit
+
+    def log_card_played(self, player, card):
+        super().log_card_played(player, card)
+        if self.cards_played % 4 == 0:
+            self.lead_suit = None
+        seat = player.nbr - 1
+        options = legal_options(self.hands[seat], self.trump_suit, self.lead_suit)
+        self.writer.write(options.index(card.index), len(options))
+        self.hands[seat].remove(card.index)
+        if self.lead_suit is None:
+            self.lead_suit = effective_suit(card, self.trump_suit)
+        self.cards_played += 1
+
+    def encode(self):
+        return self.writer.to_bytes()
+
+##### ----- REPLAY ----- #####
+class RoundReplay:
+    """
+    Everything that happened in one round. Seats are player numbers (1-4).
+    """
+    def __init__(self, number, dealer, hands, upcard, scores_before):
+        self.number = number
+        self.dealer = dealer
+        self.hands = hands
+        self.upcard = upcard
+        self.scores_before = scores_before
+        self.bids = []
+        self.trump_suit = None
+        self.declaring_team = None
+        self.discard = None
+        self.tricks = []
+        self.winners = []
+        self.tricks_won = {0: 0, 1: 0}
+        self.scores_after = None
+
+    def hands_before_trick(self, trick):
+        """
+        Returns each player's hand just before trick `trick` (0-4) is led.
+        """
+        hands = {nbr: list(hand) for nbr, hand in self.hands.items()}
+        if self.discard is not None:
+            hands[self.dealer].append(self.upcard)
+            hands[self.dealer].remove(self.discard)
+        for played in self.tricks[:trick]:
+            for nbr, card in played:
+                hands[nbr].remove(card)
+        return hands
+
+class GameReplay:
+    """
+    Rebuilds every round of an encoded game without running any agents.
+    """
+    def __init__(self, data):
+        reader = RadixReader(data)
+        self.force_dealer_pick_up = bool(reader.read(2))
+        dealer = reader.read(4)
+        self.starting_dealer = dealer + 1
+        self.rounds = []
+        scores = {0: 0, 1: 0}
+        while max(scores.values()) < 10:
+            rnd = self.replay_round(reader, len(self.rounds) + 1, dealer, scores)
+            self.rounds.append(rnd)
+            scores = rnd.scores_after
+            dealer = (dealer + 1) % 4
+        self.scores = scores
+
+    def replay_round(self, reader, number, dealer, scores):
+        pool = list(range(24))
+        hands = {}
+        for seat in range(4):
+            positions = unrank_subset(reader.read(comb(len(pool), 5)), 5)
+            hands[seat] = [pool[p] for p in positions]
+            pool = [i for i in pool if i not in hands[seat]]
+        upcard = pool[reader.read(len(pool))]
+        rnd = RoundReplay(
+            number, dealer + 1, {s + 1: [DECK[i] for i in h] for s, h in hands.items()},
+            DECK[upcard], dict(scores)
+        )
+
+        # Bidding
+        upcard_suit = DECK[upcard].suit
+        chooser = None
+        if self.force_dealer_pick_up:
+            chooser, rnd.trump_suit = dealer, upcard_suit
+            rnd.bids.append((dealer + 1, True, upcard_suit))
+        if chooser is None:
+            for i in range(4):
+                seat = (dealer + 1 + i) % 4
+                if reader.read(2):
+                    chooser, rnd.trump_suit = seat, upcard_suit
+                    rnd.bids.append((seat + 1, True, upcard_suit))
+                    break
+                rnd.bids.append((seat + 1, True, None))
+        if chooser is not None:
+            dealer_hand = sorted(hands[dealer] + [upcard])
+            discard = dealer_hand.pop(reader.read(6))
+            hands[dealer] = dealer_hand
+            rnd.discard = DECK[discard]
+        else:
+            options = round_two_options(upcard_suit)
+            for i in range(4):
+                seat = (dealer + 1 + i) % 4
+                digit = reader.read(4)
+                if digit:
+                    chooser, rnd.trump_suit = seat, options[digit - 1]
+                    rnd.bids.append((seat + 1, False, rnd.trump_suit))
+                    break
+                rnd.bids.append((seat + 1, False, None))
+            if chooser is None:
+                chooser, rnd.trump_suit = dealer, options[reader.read(3)]
+                rnd.bids.append((dealer + 1, False, rnd.trump_suit))
+        rnd.declaring_team = chooser % 2
+
+        # Tricks
+        trump = rnd.trump_suit
+        leader = (dealer + 1) % 4
+        for _ in range(5):
+            played = []
+            lead_suit = None
+            for i in range(4):
+                seat = (leader + i) % 4
+                options = legal_options(hands[seat], trump, lead_suit)
+                card = options[reader.read(len(options))]
+                hands[seat].remove(card)
+                played.append((seat + 1, DECK[card]))
+                if lead_suit is None:
+                    lead_suit = effective_suit(DECK[card], trump)
+            winner = max(played, key=lambda pc: pc[1].value(trump, lead_suit))[0]
+            rnd.tricks.append(played)
+            rnd.winners.append(winner)
+            rnd.tricks_won[(winner - 1) % 2] += 1
+            leader = winner - 1
+
+        # Scoring, as in GameEngine.play_round
+        scores = dict(scores)
+        dec_team = rnd.declaring_team
+        dec_tricks = rnd.tricks_won[dec_team]
+        if dec_tricks >= 3:
+            scores[dec_team] += 1 if dec_tricks < 5 else 2
+        else:
+            scores[1 - dec_team] += 2
+        rnd.scores_after = scores
+        return rnd
+
+    def state(self, round_number, trick=0):
+        """
+        Returns the state of the game just before trick `trick` (0-4, or 5 for the end
+        of the round) of round `round_number` (1-based).
+        """
+        rnd = self.rounds[round_number - 1]
+        return {
+            "dealer": rnd.dealer,
+            "trump": rnd.trump_suit,
+            "declaring_team": rnd.declaring_team,
+            "hands": rnd.hands_before_trick(trick),
+            "tricks": rnd.tricks[:trick],
+            "tricks_won": {t: sum(1 for w in rnd.winners[:trick] if (w - 1) % 2 == t) for t in (0, 1)},
+            "scores": rnd.scores_before,
+        }
+
+##### ----- ARCHIVES ----- #####
+# An archive is a sequence of encoded games, each prefixed by its length in two bytes.
+
+def write_archive(path, games):
+    with open(path, "ab") as f:
+        for data in games:
+            f.write(len(data).to_bytes(2, "little"))
+            f.write(data)
+
+def read_archive(path):
+    with open(path, "rb") as f:
+        content = f.read()
+    games = []
+    pos = 0
+    while pos < len(content):
+        length = int.from_bytes(content[pos:pos + 2], "little")
+        games.append(content[pos + 2:pos + 2 + length])
+        pos += 2 + length
+    return games
+
+def print_state(replay, round_number, trick):
+    state = replay.state(round_number, trick)
+    print(f"Round {round_number}, before trick {trick + 1}: dealer P{state['dealer']}, "
+          f"trump {SUIT_SYMBOLS[state['trump']]} called by Team {state['declaring_team']}")
+    for nbr, hand in state["hands"].items():
+        print(f"  P{nbr} hand: [{' '.join(c.short() for c in hand)}]")
+    for i, played in enumerate(state["tricks"], start=1):
+        print(f"  Trick {i}: " + " ".join(f"P{nbr} {c.short()}" for nbr, c in played))
+    print(f"  Tricks won: Team 0: {state['tricks_won'][0]}, Team 1: {state['tricks_won'][1]}")
+    print(f"  Scores: Team 0: {state['scores'][0]}, Team 1: {state['scores'][1]}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay games from an archive.")
+    parser.add_argument("archive")
+    parser.add_argument("--game", type=int, help="1-based game number to inspect")
+    parser.add_argument("--round", type=int, default=1)
+    parser.add_argument("--trick", type=int, default=1, help="1-5, or 6 for the end of the round")
+    args = parser.parse_args()
+
+    games = read_archive(args.archive)
+    if args.game is None:
+        wins = {0: 0, 1: 0}
+        for data in games:
+            replay = GameReplay(data)
+            wins[0 if replay.scores[0] >= 10 else 1] += 1
+        print(f"{len(games)} games, {sum(len(d) for d in games)} bytes")
+        print(f"Team 0 Wins: {wins[0]}")
+        print(f"Team 1 Wins: {wins[1]}")
+    else:
+        print_state(GameReplay(games[args.game - 1]), args.round, args.trick - 1)
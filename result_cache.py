@@ -0,0 +1,237 @@
+import argparse
+import ast
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+# Source files whose rules or seeding affect the result of a game
+RULE_FILES = ["cards.py", "game.py", "engine.py", "main.py"]
+
+DEFAULT_DIRECTORY = ".result_cache"
+
+def local_imports(path, here):
+    """
+    Returns the source files of the project modules that the file at `path` imports,
+    including imports made inside functions.
+    """
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module)
+    paths = [os.path.join(here, name.split(".")[0] + ".py") for name in names]
+    return {p for p in paths if os.path.exists(p)}
+
+def source_closure(paths, here):
+    """
+    Returns `paths` together with every project source file they import, directly or
+    through other project modules.
+    """
+    seen = set()
+    todo = list(paths)
+    while todo:
+        path = todo.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        todo.extend(local_imports(path, here) - seen)
+    return seen
+
+def class_settings(cls):
+    """
+    Describes the public class attributes of an agent, including inherited ones, as
+    they are now. Settings changed at run time (such as MonteCarlo.samples) then change
+    the key even though the source does not. Functions are described by name, since
+    their source is hashed separately.
+    """
+    names = sorted({name for base in cls.__mro__[:-1] for name in vars(base) if not name.startswith("_")})
+    lines = []
+    for name in names:
+        value = getattr(cls, name)
+        if isinstance(value, property):
+            continue
+        if callable(value):
+            value = f"{getattr(value, '__module__', '')}.{getattr(value, '__qualname__', value)}"
+        else:
+            value = repr(value)
+        lines.append(f"{name}={value}")
+    return "\n".join(lines)
+
+def competition_key(agents, fdpu, seed):
+    """
+    Returns a hash of everything that determines the results of a seeded competition:
+    the source of each agent class's modules and the engine rule code (together with
+    every project module they import), each agent's class settings and the data file
+    named by its `weights_path`, the competition settings and the seed.
+    """
+    h = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    paths = {os.path.join(here, f) for f in RULE_FILES}
+    for cls in agents:
+        h.update(f"{cls.__module__}.{cls.__qualname__}\n".encode())
+        for base in cls.__mro__[:-1]:
+            paths.add(os.path.abspath(inspect.getsourcefile(base)))
+    for path in sorted(source_closure(paths, here)):
+        with open(path, "rb") as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    for cls in agents:
+        h.update(class_settings(cls).encode())
+        data_path = getattr(cls, "weights_path", None)
+        if data_path is None:
+            continue
+        if os.path.exists(data_path):
+            with open(data_path, "rb") as f:
+                h.update(hashlib.sha256(f.read()).digest())
+        else:
+            h.update(f"{data_path} missing".encode())
+    h.update(f"fdpu={fdpu} seed={seed}".encode())
+    return h.hexdigest()[:32]
+
+class ResultCache:
+    """
+    On-disk cache of competition results. Each key directory holds one JSON file per
+    cached range of games, so an extended run only has to play the games it is missing.
+    """
+    def __init__(self, directory=DEFAULT_DIRECTORY, block_size=100):
+        self.directory = directory
+        self.block_size = block_size
+
+    def key_dir(self, key):
+        return os.path.join(self.directory, key)
+
+    def entry_path(self, key, start, stop):
+        return os.path.join(self.key_dir(key), f"{start:08d}-{stop:08d}.json")
+
+    def ranges(self, key):
+        """
+        Returns the (start, stop) ranges of games cached under `key`.
+        """
+        if not os.path.isdir(self.key_dir(key)):
+            return []
+        ranges = []
+        for name in os.listdir(self.key_dir(key)):
+            if name == "meta.json" or not name.endswith(".json"):
+                continue
+            try:
+                start, stop = name[:-len(".json")].split("-")
+                ranges.append((int(start), int(stop)))
+            except ValueError:
+                continue  # not a cached range
+        return sorted(ranges)
+
+    def plan(self, key, game_count):
+        """
+        Covers games 0 to `game_count` with cached ranges where possible and block-aligned
+        ranges still to be played elsewhere. Returns (start, stop, cached) triples.
+        """
+        cached = self.ranges(key)
+        plan = []
+        pos = 0
+        while pos < game_count:
+            usable = [stop for start, stop in cached if start == pos and stop <= game_count]
+            if usable:
+                plan.append((pos, max(usable), True))
+                pos = max(usable)
+                continue
+            stop = min((pos // self.block_size + 1) * self.block_size, game_count)
+            stop = min([stop] + [start for start, _ in cached if pos < start < stop])
+            plan.append((pos, stop, False))
+            pos = stop
+        return plan
+
+    def load(self, key, start, stop):
+        path = self.entry_path(key, start, stop)
+        with open(path) as f:
+            result = json.load(f)
+        os.utime(path)  # mark as recently used for eviction
+        return {int(t): w for t, w in result["wins"].items()}, {int(t): p for t, p in result["points"].items()}
+
+    def store(self, key, start, stop, wins, points, meta):
+        os.makedirs(self.key_dir(key), exist_ok=True)
+        meta_path = os.path.join(self.key_dir(key), "meta.json")
+        if not os.path.exists(meta_path):
+            self.write(meta_path, meta)
+        self.write(self.entry_path(key, start, stop), {"wins": wins, "points": points})
+
+    def write(self, path, data):
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def entries(self):
+        """
+        Returns (key, path, size, last used) for every cached range.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for key in os.listdir(self.directory):
+            for start, stop in self.ranges(key):
+                path = self.entry_path(key, start, stop)
+                stat = os.stat(path)
+                entries.append((key, path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def evict(self, max_bytes=None, max_age_days=None):
+        """
+        Removes cached ranges not used for `max_age_days`, then the least recently used
+        ones until the cache holds at most `max_bytes`. Returns how many were removed.
+        """
+        entries = sorted(self.entries(), key=lambda e: e[3])
+        removed = 0
+        total = sum(e[2] for e in entries)
+        cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else None
+        for key, path, size, used in entries:
+            too_old = cutoff is not None and used < cutoff
+            too_big = max_bytes is not None and total > max_bytes
+            if not (too_old or too_big):
+                continue
+            os.remove(path)
+            total -= size
+            removed += 1
+        for key in os.listdir(self.directory) if os.path.isdir(self.directory) else []:
+            if os.path.isdir(self.key_dir(key)) and not self.ranges(key):
+                shutil.rmtree(self.key_dir(key), ignore_errors=True)
+        return removed
+
+    def describe(self):
+        """
+        Prints what each key of the cache holds.
+        """
+        by_key = {}
+        for key, path, size, used in self.entries():
+            by_key.setdefault(key, []).append((size, used))
+        if not by_key:
+            print(f"Cache at {self.directory} is empty")
+            return
+        for key, items in sorted(by_key.items()):
+            with open(os.path.join(self.key_dir(key), "meta.json")) as f:
+                meta = json.load(f)
+            games = sum(stop - start for start, stop in self.ranges(key))
+            last_used = datetime.fromtimestamp(max(u for _, u in items)).strftime('%m-%d-%y %I:%M%p')
+            print(f"{key}: {' '.join(meta['agents'])} fdpu={meta['fdpu']} seed={meta['seed']}")
+            print(f"    {games} games in {len(items)} ranges, {sum(s for s, _ in items)} bytes, last used {last_used}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or prune the competition result cache.")
+    parser.add_argument("command", choices=["list", "evict", "clear"])
+    parser.add_argument("--dir", default=DEFAULT_DIRECTORY)
+    parser.add_argument("--max-bytes", type=int)
+    parser.add_argument("--max-age-days", type=float)
+    args = parser.parse_args()
+
+    cache = ResultCache(args.dir)
+    if args.command == "list":
+        cache.describe()
+    elif args.command == "evict":
+        print(f"Removed {cache.evict(args.max_bytes, args.max_age_days)} cached ranges")
+    elif args.command == "clear":
+        print(f"Removed {cache.evict(max_bytes=0)} cached ranges")
@@ -0,0 +1,147 @@
+from cards import *
+
+##### ----- FAST ROLLOUTS ----- #####
+# Plays out rounds on compact card indices (see card_index) with precomputed tables,
+# instead of Card objects and Player instances. Seats are 0-3 (player number - 1) and
+# seat % 2 is the seat's team. Suits are indices into SUITS.
+#
+# The policies below copy choose_ge3, forced_choose_max_suit_count,
+# discard_lowest_nontrump_rank and HighWithCaution.play_card from player.py and must
+# be kept in step with them. Bid and discard policies take and return indices, so
+# other models can be passed in their place (see MonteCarlo.rollout_models).
+
+NO_LEAD = len(SUITS)
+
+# EFFECTIVE[trump][card] is the card's suit for follow-suit purposes
+EFFECTIVE = [
+    [SUITS.index(effective_suit(card, trump)) for card in DECK]
+    for trump in SUITS
+]
+
+# VALUE[trump][lead][card] is Card.value, with NO_LEAD for an empty trick
+VALUE = [
+    [[card.value(trump, lead) for card in DECK] for lead in SUITS + [None]]
+    for trump in SUITS
+]
+
+SUIT_OF = [SUITS.index(card.suit) for card in DECK]
+
+# Discard order used by discard_lowest_nontrump_rank (ranks compared as strings)
+DISCARD_ORDER = sorted(range(len(DECK)), key=lambda i: (DECK[i].rank, i))
+
+##### ----- POLICIES ----- #####
+def playable(hand, trump, lead):
+    if lead == NO_LEAD:
+        return hand
+    effective = EFFECTIVE[trump]
+    following = [c for c in hand if effective[c] == lead]
+    return following if following else hand
+
+def caution_play(hand, trick, trump, lead):
+    """
+    HighWithCaution.play_card: once anyone has played, the lowest card that beats the
+    trick so far; otherwise (or if none can) the lowest card.
+    """
+    values = VALUE[trump][lead]
+    options = sorted(playable(hand, trump, lead), key=lambda c: (values[c], c))
+    if trick:
+        winning = max(values[c] for c in trick)
+        for c in options:
+            if values[c] > winning:
+                return c
+    return options[0]
+
+def ge3_bid(hand, upcard, first_round):
+    """
+    choose_ge3: returns the suit called, or None to pass.
+    """
+    upcard_suit = SUIT_OF[upcard]
+    counts = [0] * len(SUITS)
+    for c in hand:
+        counts[SUIT_OF[c]] += 1
+    if first_round:
+        return upcard_suit if counts[upcard_suit] >= 3 else None
+    for suit in range(len(SUITS)):
+        if suit != upcard_suit and counts[suit] >= 3:
+            return suit
+    return None
+
+def max_suit_count(hand, forbidden):
+    """
+    forced_choose_max_suit_count: the allowed suit the hand has the most of.
+    """
+    counts = [0] * len(SUITS)
+    for c in hand:
+        counts[SUIT_OF[c]] += 1
+    allowed = [s for s in range(len(SUITS)) if s != forbidden]
+    return max(allowed, key=lambda s: counts[s])
+
+def lowest_rank_discard(hand, trump):
+    """
+    discard_lowest_nontrump_rank.
+    """
+    ordered = [c for c in DISCARD_ORDER if c in hand]
+    for c in ordered:
+        if SUIT_OF[c] != trump:
+            return c
+    return ordered[0]
+
+##### ----- ROUNDS ----- #####
+def finish_bidding(hands, dealer, upcard, first_round, last_bidder, bid=ge3_bid, forced_bid=max_suit_count):
+    """
+    Continues bidding after `last_bidder` passed, with every player bidding like `bid`
+    (choose_ge3 by default) and a stuck dealer like `forced_bid`
+    (forced_choose_max_suit_count). Returns the trump suit, the declaring seat and
+    whether the dealer picks up the upcard.
+    """
+    order = [(dealer + 1 + i) % 4 for i in range(4)]
+    remaining = [(True, s) for s in order] + [(False, s) for s in order]
+    start = remaining.index((first_round, last_bidder)) + 1
+    for is_first, seat in remaining[start:]:
+        suit = bid(hands[seat], upcard, is_first)
+        if suit is not None:
+            return suit, seat, is_first
+    return forced_bid(hands[dealer], SUIT_OF[upcard]), dealer, False
+
+def play_round(hands, trump, leader):
+    """
+    Plays out the remaining tricks with every player playing like HighWithCaution.
+    `hands` is modified. Returns the tricks won by each team.
+    """
+    won = [0, 0]
+    effective = EFFECTIVE[trump]
+    for _ in range(len(hands[0])):
+        trick = []
+        lead = NO_LEAD
+        for i in range(4):
+            seat = (leader + i) % 4
+            card = caution_play(hands[seat], trick, trump, lead)
+            hands[seat].remove(card)
+            trick.append(card)
+            if lead == NO_LEAD:
+                lead = effective[card]
+        values = VALUE[trump][lead]
+        best = max(range(4), key=lambda i: values[trick[i]])
+        leader = (leader + best) % 4
+        won[leader % 2] += 1
+    return won
+
+def round_score(hands, dealer, upcard, trump, declarer, picked_up, seat, discard=None, discard_policy=lowest_rank_discard):
+    """
+    Plays a round from the end of bidding and returns the points scored by `seat`'s
+    team minus those scored by the other team. If the dealer picked up the upcard they
+    discard `discard`, or like `discard_policy` (discard_lowest_nontrump_rank by
+    default) if it is None.
+    """
+    hands = [list(h) for h in hands]
+    if picked_up:
+        hands[dealer].append(upcard)
+        hands[dealer].remove(discard_policy(hands[dealer], trump) if discard is None else discard)
+    won = play_round(hands, trump, (dealer + 1) % 4)
+    dec_team = declarer % 2
+    dec_tricks = won[dec_team]
+    if dec_tricks >= 3:
+        points = 1 if dec_tricks < 5 else 2
+    else:
+        points = -2
+    return points if seat % 2 == dec_team else -points
@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import random
+from multiprocessing import Pool
+
+import numpy as np
+
+from cards import *
+from engine import GameEngine
+from features import *
+from logger import NullLogger
+from main import agent_class
+
+class DecisionRecorder(NullLogger):
+    """
+    Logger that follows the public state of each round and collects the decision
+    points of recording agents. Samples are labelled when their round ends.
+    """
+    def __init__(self):
+        super().__init__()
+        self.features = []
+        self.kinds = []
+        self.actions = []
+        self.outcomes = []
+        self.tricks = []
+        self.pending = []
+        self.new_game()
+
+    def new_game(self):
+        self.prev_scores = {0: 0, 1: 0}
+
+    def start_round(self, round_num, dealer, hands, upcard):
+        super().start_round(round_num, dealer, hands, upcard)
+        self.dealer_nbr = dealer.nbr
+        self.upcard = upcard
+        self.seen = []
+        self.trump_suit = None
+        self.declaring_team = None
+
+    def log_order_up(self, chooser, dealer):
+        super().log_order_up(chooser, dealer)
+        self.trump_suit = self.upcard.suit
+        self.declaring_team = chooser.team
+
+    def log_call_trump(self, chooser, suit):
+        super().log_call_trump(chooser, suit)
+        self.trump_suit = suit
+        self.declaring_team = chooser.team
+
+    def log_forced_trump(self, dealer, suit):
+        super().log_forced_trump(dealer, suit)
+        self.trump_suit = suit
+        self.declaring_team = dealer.team
+
+    def log_card_played(self, player, card):
+        super().log_card_played(player, card)
+        self.seen.append(card)
+
+    def log_round_end(self, tricks, declaring_team, scores):
+        super().log_round_end(tricks, declaring_team, scores)
+        gained = {team: scores[team] - self.prev_scores[team] for team in (0, 1)}
+        self.prev_scores = dict(scores)
+        for team, x, kind, action in self.pending:
+            self.features.append(x)
+            self.kinds.append(kind)
+            self.actions.append(action)
+            self.outcomes.append(gained[team] - gained[1 - team])
+            self.tricks.append(tricks[team])
+        self.pending = []
+
+    def record(self, p, kind, hand, action, trick=(), lead_suit=None, first_round=False):
+        x = encode_state(
+            kind, p.nbr, p.team, hand, self.seen, trick, self.upcard, self.dealer_nbr,
+            trump_suit=self.trump_suit, lead_suit=lead_suit,
+            declaring_team=self.declaring_team, first_round=first_round
+        )
+        self.pending.append((p.team, x, kind, action))
+
+    def arrays(self):
+        """
+        Returns the labelled samples collected so far as NumPy arrays.
+        """
+        return {
+            "features": np.array(self.features, dtype=np.uint8).reshape(-1, FEATURE_SIZE),
+            "kinds": np.array(self.kinds, dtype=np.uint8),
+            "actions": np.array(self.actions, dtype=np.uint8),
+            "outcomes": np.array(self.outcomes, dtype=np.int8),
+            "tricks": np.array(self.tricks, dtype=np.int8),
+        }
+
+def recording(cls):
+    """
+    Returns a subclass of the agent `cls` that reports each of its decisions to
+    `self.recorder` before making them.
+    """
+    class Recording(cls):
+        recorder = None
+
+        def choose_trump(self, upcard, first_round):
+            hand = list(self.hand)
+            pick, suit = super().choose_trump(upcard, first_round)
+            action = SUITS.index(suit) if pick else PASS
+            self.recorder.record(self, BID, hand, action, first_round=first_round)
+            return pick, suit
+
+        def forced_choose_trump(self, forbidden):
+            hand = list(self.hand)
+            suit = super().forced_choose_trump(forbidden)
+            self.recorder.record(self, BID, hand, SUITS.index(suit))
+            return suit
+
+        def discard(self, trump):
+            hand = list(self.hand)
+            card = super().discard(trump)
+            self.recorder.record(self, DISCARD, hand, card_index(card))
+            return card
+
+        def play_card(self, trick, trump_suit, lead_suit):
+            hand = list(self.hand)
+            trick_so_far = list(trick)
+            card = super().play_card(trick, trump_suit, lead_suit)
+            self.recorder.record(self, PLAY, hand, card_index(card), trick_so_far, lead_suit)
+            return card
+
+    Recording.__name__ = cls.__name__
+    return Recording
+
+##### ----- SHARDS ----- #####
+def shard_name(index):
+    return f"shard-{index:05d}.npz"
+
+def play_shard(job):
+    """
+    Plays the games of one shard and writes their samples to disk. Each shard is
+    seeded on its own so results do not depend on which worker ran it.
+    """
+    agents, fdpu, seed, game_count, path = job
+    random.seed(seed)
+    recorder = DecisionRecorder()
+    classes = [recording(A) for A in agents]
+    for _ in range(game_count):
+        recorder.new_game()
+        players = [
+            classes[0](1, 3, team=0),
+            classes[1](2, 4, team=1),
+            classes[2](3, 1, team=0),
+            classes[3](4, 2, team=1)
+        ]
+        for p in players:
+            p.recorder = recorder
+        engine = GameEngine(players, fdpu, recorder)
+        engine.play_game()
+    arrays = recorder.arrays()
+    tmp_path = path[:-len(".npz")] + ".tmp.npz"
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+    return len(arrays["actions"])
+
+def write_manifest(directory, manifest):
+    path = os.path.join(directory, "manifest.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+def load_manifest(directory):
+    with open(os.path.join(directory, "manifest.json")) as f:
+        return json.load(f)
+
+def generate(agents, directory, shard_count, games_per_shard=100, workers=None, fdpu=False, seed=0):
+    """
+    Runs self-play with the four agent classes `agents` (seated P1-P4) and streams the
+    encoded decision points into `shard_count` shards under `directory`. Shards already
+    listed in the manifest are skipped, so an interrupted run can be resumed by calling
+    this again with the same arguments.
+    """
+    os.makedirs(directory, exist_ok=True)
+    settings = {
+        "agents": [A.__name__ for A in agents],
+        "fdpu": fdpu,
+        "seed": seed,
+        "games_per_shard": games_per_shard,
+        "feature_size": FEATURE_SIZE,
+    }
+    manifest_path = os.path.join(directory, "manifest.json")
+    if os.path.exists(manifest_path):
+        manifest = load_manifest(directory)
+        existing = {k: manifest[k] for k in settings}
+        if existing != settings:
+            raise ValueError(f"{directory} holds a dataset with different settings: {existing}")
+    else:
+        manifest = dict(settings, shards={})
+
+    # Shard seeds are drawn from `seed` rather than counted up from it, so datasets
+    # generated with nearby seeds do not share games
+    rng = random.Random(seed)
+    shard_seeds = [rng.getrandbits(32) for _ in range(shard_count)]
+    jobs = []
+    for i in range(shard_count):
+        name = shard_name(i)
+        if name in manifest["shards"] and os.path.exists(os.path.join(directory, name)):
+            continue
+        jobs.append((agents, fdpu, shard_seeds[i], games_per_shard, os.path.join(directory, name)))
+
+    print(f"Generating {len(jobs)} of {shard_count} shards...", end="")
+    with Pool(workers) as pool:
+        for job, samples in zip(jobs, pool.imap(play_shard, jobs)):
+            name = os.path.basename(job[4])
+            manifest["shards"][name] = {"games": games_per_shard, "samples": samples}
+            write_manifest(directory, manifest)
+    print(" done!")
+    print(f"Total samples: {sum(s['samples'] for s in manifest['shards'].values())}")
+
+def load_shards(directory):
+    """
+    Yields the arrays of each completed shard in turn, so a dataset can be processed
+    without loading all of it at once.
+    """
+    manifest = load_manifest(directory)
+    for name in sorted(manifest["shards"]):
+        with np.load(os.path.join(directory, name)) as data:
+            yield {k: data[k] for k in data.files}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate self-play training data.")
+    parser.add_argument("directory")
+    parser.add_argument("--agents", nargs=4, default=["HighWithCaution", "SmartRandom", "HighWithCaution", "SmartRandom"])
+    parser.add_argument("--shards", type=int, default=10)
+    parser.add_argument("--games", type=int, default=100, help="games per shard")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--fdpu", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    agents = [agent_class(name) for name in args.agents]
+    generate(agents, args.directory, args.shards, args.games, args.workers, args.fdpu, args.seed)